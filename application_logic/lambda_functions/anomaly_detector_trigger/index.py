@@ -4,27 +4,99 @@
 # for remediation if anomalies are detected.
 
 
+import io
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import logging
 import boto3
-import pandas as pd
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool shared by all clients so warm invocations reuse TLS sessions.
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    connect_timeout=2,
+    read_timeout=15
+)
+
 # AWS SDK clients
-sagemaker_runtime = boto3.client('sagemaker-runtime')
-s3 = boto3.client('s3')
-stepfunctions = boto3.client('stepfunctions')
+sagemaker_runtime = boto3.client('sagemaker-runtime', config=BOTO_CONFIG.merge(Config(read_timeout=60))) # Endpoint invocations can run up to 60s
+s3 = boto3.client('s3', config=BOTO_CONFIG)
+stepfunctions = boto3.client('stepfunctions', config=BOTO_CONFIG)
+sns_client = boto3.client('sns', config=BOTO_CONFIG)
+
+# Worker threads for the Step Function fan-out. Created once per container and never shut
+# down, so warm invocations skip thread start-up and reuse the pooled HTTPS connections.
+io_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='io')
 
 # Environment variables
 SAGEMAKER_ENDPOINT_NAME = os.environ.get('SAGEMAKER_ENDPOINT_NAME')
 PROCESSED_DATA_BUCKET = os.environ.get('PROCESSED_DATA_BUCKET')
 SNS_ANOMALY_TOPIC_ARN = os.environ.get('SNS_ANOMALY_TOPIC_ARN')
 STEP_FUNCTION_ARN = os.environ.get('STEP_FUNCTION_ARN') # ARN of the egress remediation Step Function
+# Optional comma-separated list of parquet columns to load (model features plus resource_id/usage_date
+# for context). Unset means every column is read and sent to the endpoint.
+INFERENCE_FEATURE_COLUMNS = [c.strip() for c in os.environ.get('INFERENCE_FEATURE_COLUMNS', '').split(',') if c.strip()] or None
+
+# Fallback values for anomaly fields the processed features may not contain
+ANOMALY_FIELD_DEFAULTS = {
+    'resource_id': 'unknown',
+    'daily_egress_cost_usd': 0,
+    'anomaly_score': 0
+}
+
+def start_remediation_workflow(anomaly: dict) -> str:
+    """
+    Starts one execution of the remediation Step Function for a single anomaly record.
+    The record must already contain every key in ANOMALY_FIELD_DEFAULTS plus 'usage_date'.
+    Returns the execution ARN.
+    """
+    # Prepare input for Step Function
+    # This input should contain enough context for Bedrock Analyzer and Remediation Orchestrator
+    step_function_input = {
+        "anomalyType": "EgressCostSpike", # Generic type, Bedrock will refine
+        "resourceId": anomaly['resource_id'],
+        "costImpact": anomaly['daily_egress_cost_usd'],
+        "anomalyScore": anomaly['anomaly_score'],
+        "timestamp": anomaly['usage_date'],
+        "details": anomaly # Pass full anomaly details
+    }
+    execution_input = orjson.dumps(step_function_input).decode('utf-8')
+    logger.info(f"Triggering Step Function with input: {execution_input}")
+
+    # Start Step Function execution
+    response = stepfunctions.start_execution(
+        stateMachineArn=STEP_FUNCTION_ARN,
+        input=execution_input
+    )
+    logger.info(f"Step Function execution started for anomaly: {response['executionArn']}")
+    return response['executionArn']
+
+def prime_container():
+    """
+    Warms a provisioned-concurrency container during the INIT phase: imports pyarrow and opens
+    the keep-alive connection to S3 so the first real invocation doesn't pay for either.
+    """
+    try:
+        import pyarrow.parquet # noqa: F401
+        if PROCESSED_DATA_BUCKET:
+            s3.head_bucket(Bucket=PROCESSED_DATA_BUCKET)
+        logger.info("Container primed for provisioned concurrency.")
+    except Exception as e:
+        logger.warning(f"Container priming failed; continuing without it: {e}")
+
+# On-demand containers skip priming so the "no new data" path keeps its fast cold start
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency':
+    prime_container()
 
 def lambda_handler(event, context):
     """
@@ -52,8 +124,14 @@ def lambda_handler(event, context):
 
         try:
             response = s3.get_object(Bucket=PROCESSED_DATA_BUCKET, Key=latest_data_key)
-            df_latest_features = pd.read_parquet(io.BytesIO(response['Body'].read()))
-            logger.info(f"Successfully loaded {len(df_latest_features)} data points for inference.")
+            # pyarrow is imported here rather than at module load so that cold starts
+            # which end in the "no new data" branch don't pay for it. Python caches the
+            # module, so warm invocations import it only once per container.
+            import pyarrow.parquet as pq
+            # Read straight into an Arrow table; no intermediate pandas DataFrame is needed.
+            # Only the configured columns are decoded, which also keeps the endpoint payload small.
+            latest_features = pq.read_table(io.BytesIO(response['Body'].read()), columns=INFERENCE_FEATURE_COLUMNS)
+            logger.info(f"Successfully loaded {latest_features.num_rows} data points for inference.")
         except ClientError as e:
             if e.response['Error']['Code'] == 'NoSuchKey':
                 logger.warning(f"No latest features file found at {latest_data_key}. Skipping inference.")
@@ -69,8 +147,9 @@ def lambda_handler(event, context):
 
         # Prepare data for SageMaker endpoint invocation
         # The inference_script.py expects JSON format
-        inference_payload = df_latest_features.to_json(orient='records')
-        logger.info(f"Prepared inference payload (first 100 chars): {inference_payload[:100]}...")
+        # orjson writes dates/timestamps as ISO strings; anything else it can't encode falls back to str()
+        inference_payload = orjson.dumps(latest_features.to_pylist(), default=str)
+        logger.info(f"Prepared inference payload (first 100 chars): {inference_payload[:100].decode('utf-8', 'replace')}...")
 
         # --- 2. Invoke SageMaker Endpoint for Anomaly Detection ---
         logger.info(f"Invoking SageMaker endpoint: {SAGEMAKER_ENDPOINT_NAME}")
@@ -82,35 +161,26 @@ def lambda_handler(event, context):
         )
 
         # Parse SageMaker response
-        result = json.loads(sagemaker_response['Body'].read().decode('utf-8'))
-        df_inference_results = pd.DataFrame(result)
-        logger.info(f"SageMaker inference returned {len(df_inference_results)} results.")
-        logger.info(f"Inference results head:\n{df_inference_results.head()}")
+        result = orjson.loads(sagemaker_response['Body'].read())
+        logger.info(f"SageMaker inference returned {len(result)} results.")
+        logger.info(f"Inference results head: {result[:3]}")
 
         # --- 3. Identify Anomalies and Trigger Step Function ---
-        anomalies = df_inference_results[df_inference_results['is_anomaly'] == 1]
+        # The endpoint returns a list of records; filter it directly rather than building a DataFrame
+        anomalies = [record for record in result if record.get('is_anomaly') == 1]
 
-        if not anomalies.empty:
+        if anomalies:
             logger.warning(f"Detected {len(anomalies)} egress cost anomalies!")
-            for index, anomaly in anomalies.iterrows():
-                # Prepare input for Step Function
-                # This input should contain enough context for Bedrock Analyzer and Remediation Orchestrator
-                step_function_input = {
-                    "anomalyType": "EgressCostSpike", # Generic type, Bedrock will refine
-                    "resourceId": anomaly.get('resource_id', 'unknown'), # Assuming 'resource_id' is in processed features
-                    "costImpact": anomaly.get('daily_egress_cost_usd', 0),
-                    "anomalyScore": anomaly.get('anomaly_score', 0),
-                    "timestamp": anomaly.get('usage_date', str(pd.Timestamp.now())),
-                    "details": anomaly.to_dict() # Pass full anomaly details
-                }
-                logger.info(f"Triggering Step Function with input: {json.dumps(step_function_input)}")
-
-                # Start Step Function execution
-                stepfunctions.start_execution(
-                    stateMachineArn=STEP_FUNCTION_ARN,
-                    input=json.dumps(step_function_input)
-                )
-                logger.info("Step Function execution started for anomaly.")
+            # Every record carries the same fields, so work out the missing ones once per batch
+            missing_fields = {field: default for field, default in ANOMALY_FIELD_DEFAULTS.items() if field not in anomalies[0]}
+            if 'usage_date' not in anomalies[0]:
+                missing_fields['usage_date'] = datetime.now(timezone.utc).isoformat()
+            anomaly_records = [{**anomaly, **missing_fields} for anomaly in anomalies] if missing_fields else anomalies
+            # Each StartExecution is an independent HTTPS round trip, so issue them concurrently
+            executions = [io_executor.submit(start_remediation_workflow, anomaly) for anomaly in anomaly_records]
+            for execution in executions:
+                execution.result() # Re-raises any ClientError from the worker thread
+            logger.info(f"Started {len(executions)} Step Function executions.")
         else:
             logger.info("No egress cost anomalies detected.")
 
@@ -122,8 +192,7 @@ def lambda_handler(event, context):
     except ClientError as e:
         logger.error(f"AWS Client Error: {e.response['Error']['Code']} - {e.response['Error']['Message']}", exc_info=True)
         # Publish to SNS for critical errors
-        sns = boto3.client('sns')
-        sns.publish(
+        sns_client.publish(
             TopicArn=SNS_ANOMALY_TOPIC_ARN,
             Subject=f"CRITICAL: Egress Anomaly Detector Trigger Failed in {context.function_name}",
             Message=f"An AWS client error occurred: {e.response['Error']['Message']}\nFunction ARN: {context.invoked_function_arn}"
@@ -135,8 +204,7 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}", exc_info=True)
         # Publish to SNS for critical errors
-        sns = boto3.client('sns')
-        sns.publish(
+        sns_client.publish(
             TopicArn=SNS_ANOMALY_TOPIC_ARN,
             Subject=f"CRITICAL: Egress Anomaly Detector Trigger Failed in {context.function_name}",
             Message=f"An unexpected error occurred: {e}\nFunction ARN: {context.invoked_function_arn}"
@@ -8,19 +8,35 @@ import json
 import os
 import logging
 import boto3
-import pandas as pd
-from botocore.exceptions import ClientError
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Client configuration: keep-alive connections and adaptive retries for the Config/CloudTrail/CE lookups.
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    connect_timeout=2,
+    read_timeout=15
+)
+
 # AWS SDK clients
-bedrock_runtime = boto3.client('bedrock-runtime')
-config_client = boto3.client('config')
-cloudtrail_client = boto3.client('cloudtrail')
-ce_client = boto3.client('ce') # Cost Explorer client
-s3_client = boto3.client('s3') # To read prompt templates
+bedrock_runtime = boto3.client('bedrock-runtime', config=BOTO_CONFIG.merge(Config(read_timeout=120))) # LLM completions are slow
+config_client = boto3.client('config', config=BOTO_CONFIG)
+cloudtrail_client = boto3.client('cloudtrail', config=BOTO_CONFIG)
+ce_client = boto3.client('ce', config=BOTO_CONFIG) # Cost Explorer client
+s3_client = boto3.client('s3', config=BOTO_CONFIG) # To read prompt templates
+sns_client = boto3.client('sns', config=BOTO_CONFIG)
+
+# Worker threads for the contextual lookups; created once per container and never shut down
+io_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='io')
 
 # Environment variables
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID')
@@ -28,21 +44,50 @@ SNS_ANOMALY_TOPIC_ARN = os.environ.get('SNS_ANOMALY_TOPIC_ARN')
 PROCESSED_DATA_BUCKET = os.environ.get('PROCESSED_DATA_BUCKET') # For fetching more data if needed
 PROMPT_TEMPLATE_KEY = "bedrock_prompts/egress_root_cause_prompt.txt" # Adjust path to your prompt template
 
-def get_contextual_data(resource_id: str, anomaly_details: dict) -> str:
+# SNS alert templates for a completed analysis
+ALERT_SUBJECT_TEMPLATE = "Egress Anomaly Detected: {anomaly_type} on {resource_id}"
+ALERT_MESSAGE_TEMPLATE = (
+    "An egress cost anomaly has been detected.\n\n"
+    "Anomaly Type: {anomaly_type}\n"
+    "Resource ID: {resource_id}\n"
+    "Cost Impact: ${cost_impact}\n\n"
+    "--- AI-Powered Root Cause Analysis & Recommendations ---\n"
+    "{llm_analysis}\n\n"
+    "--- Raw Anomaly Details ---\n"
+    "{anomaly_details}"
+)
+
+# Prompt templates loaded from S3, keyed by (bucket, key); kept for the container's lifetime
+prompt_template_cache = {}
+
+def get_anomaly_time(anomaly_details: dict) -> datetime:
     """
-    Gathers relevant contextual data from AWS Config, CloudTrail, and Cost Explorer.
+    Returns the anomaly timestamp as a timezone-aware datetime, defaulting to now (UTC).
     """
-    context_data = []
+    timestamp = anomaly_details.get('timestamp')
+    if not timestamp:
+        return datetime.now(timezone.utc)
+    # fromisoformat on Python 3.9 doesn't accept a trailing 'Z'
+    anomaly_time = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    if anomaly_time.tzinfo is None:
+        anomaly_time = anomaly_time.replace(tzinfo=timezone.utc)
+    return anomaly_time
 
-    # --- 1. AWS Config: Recent resource changes ---
+def get_config_context(resource_id: str, anomaly_details: dict) -> list:
+    """
+    Returns context lines describing recent AWS Config changes for the resource.
+    """
+    context_data = []
     try:
         # Get resource configuration history for the last 24 hours
         # This is a simplified lookup. For cross-account, you'd need assume-role.
         logger.info(f"Querying AWS Config for resource: {resource_id}")
+        anomaly_time = get_anomaly_time(anomaly_details)
         config_response = config_client.get_resource_config_history(
             resourceType='AWS::EC2::Instance', # Example: Adjust based on resource type
             resourceId=resource_id,
-            laterTime=anomaly_details.get('timestamp', str(pd.Timestamp.now() - pd.Timedelta(days=1))), # Look back 24 hours from anomaly
+            earlierTime=anomaly_time - timedelta(days=1), # Only the 24 hours before the anomaly
+            laterTime=anomaly_time,
             limit=5 # Get latest 5 changes
         )
         if config_response.get('configurationItems'):
@@ -51,37 +96,50 @@ def get_contextual_data(resource_id: str, anomaly_details: dict) -> str:
                 context_data.append(f"Timestamp: {item['configurationItemCaptureTime']}, ChangeType: {item['changeType']}, Status: {item['configurationItemStatus']}")
                 # You might parse item['configuration'] for more details
             context_data.append("")
-    except ClientError as e:
+    except (ClientError, BotoCoreError) as e: # BotoCoreError covers connect/read timeouts
         logger.warning(f"Could not retrieve Config history for {resource_id}: {e}")
+    return context_data
 
-    # --- 2. AWS CloudTrail: Recent API calls ---
+def get_cloudtrail_context(resource_id: str, anomaly_details: dict) -> list:
+    """
+    Returns context lines describing recent CloudTrail API calls for the resource.
+    """
+    context_data = []
     try:
         # Look up CloudTrail events related to the resource or service in the last 24 hours
         logger.info(f"Querying AWS CloudTrail for resource: {resource_id}")
+        anomaly_time = get_anomaly_time(anomaly_details)
+        # LookupEvents accepts a single lookup attribute; the resource name is the most selective
         cloudtrail_response = cloudtrail_client.lookup_events(
             LookupAttributes=[
-                {'AttributeKey': 'ResourceName', 'AttributeValue': resource_id.split('/')[-1]}, # Use resource name
-                {'AttributeKey': 'ResourceType', 'AttributeValue': resource_id.split('/')[6]} # Example: 'AWS::EC2::Instance'
+                {'AttributeKey': 'ResourceName', 'AttributeValue': resource_id.split('/')[-1]} # Use resource name
             ],
-            StartTime=pd.Timestamp(anomaly_details.get('timestamp', pd.Timestamp.now())) - pd.Timedelta(days=1),
-            EndTime=pd.Timestamp(anomaly_details.get('timestamp', pd.Timestamp.now()))
+            StartTime=anomaly_time - timedelta(days=1),
+            EndTime=anomaly_time,
+            MaxResults=5 # Only the latest 5 events are used, so don't fetch more
         )
         if cloudtrail_response.get('Events'):
             context_data.append("--- AWS CloudTrail Recent Events ---")
-            for event in cloudtrail_response['Events'][:5]: # Limit to 5 events
+            for event in cloudtrail_response['Events']:
                 context_data.append(f"EventTime: {event['EventTime']}, EventName: {event['EventName']}, User: {event['Username']}")
             context_data.append("")
-    except ClientError as e:
+    except (ClientError, BotoCoreError) as e: # BotoCoreError covers connect/read timeouts
         logger.warning(f"Could not retrieve CloudTrail events for {resource_id}: {e}")
+    return context_data
 
-    # --- 3. AWS Cost Explorer (for broader cost context) ---
+def get_cost_explorer_context(resource_id: str, anomaly_details: dict) -> list:
+    """
+    Returns context lines with a Cost Explorer snapshot around the anomaly time.
+    """
+    context_data = []
     try:
         # Get cost breakdown for the service/resource around the anomaly time
         logger.info(f"Querying AWS Cost Explorer for service: {anomaly_details.get('service_code')}")
+        anomaly_time = get_anomaly_time(anomaly_details)
         ce_response = ce_client.get_cost_and_usage(
             TimePeriod={
-                'Start': (pd.Timestamp(anomaly_details.get('timestamp', pd.Timestamp.now())) - pd.Timedelta(days=2)).strftime('%Y-%m-%d'),
-                'End': (pd.Timestamp(anomaly_details.get('timestamp', pd.Timestamp.now())) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                'Start': (anomaly_time - timedelta(days=2)).strftime('%Y-%m-%d'),
+                'End': (anomaly_time + timedelta(days=1)).strftime('%Y-%m-%d')
             },
             Granularity='DAILY',
             Metrics=['BlendedCost'],
@@ -96,10 +154,25 @@ def get_contextual_data(resource_id: str, anomaly_details: dict) -> str:
                 context_data.append(f"Date: {result['TimePeriod']['Start']}, Total Cost: {result['Total']['BlendedCost']['Amount']} {result['Total']['BlendedCost']['Unit']}")
                 # You can parse Groups for more detail on services/usage types
             context_data.append("")
-    except ClientError as e:
+    except (ClientError, BotoCoreError) as e: # BotoCoreError covers connect/read timeouts
         logger.warning(f"Could not retrieve Cost Explorer data: {e}")
+    return context_data
+
+# Context lookups, in the order their sections appear in the prompt
+CONTEXT_LOOKUPS = [get_config_context, get_cloudtrail_context, get_cost_explorer_context]
+
+def get_contextual_data(resource_id: str, anomaly_details: dict) -> str:
+    """
+    Gathers relevant contextual data from AWS Config, CloudTrail, and Cost Explorer.
+    The three lookups are independent, so they run concurrently and the wall time is
+    bounded by the slowest call rather than their sum.
+    """
+    futures = [io_executor.submit(lookup, resource_id, anomaly_details) for lookup in CONTEXT_LOOKUPS]
+    context_data = []
+    for future in futures:
+        context_data.extend(future.result())
 
-    # --- 4. Raw Log Snippets (Conceptual) ---
+    # --- Raw Log Snippets (Conceptual) ---
     # In a more advanced setup, you might fetch relevant log lines directly from S3
     # (VPC Flow Logs, S3 Access Logs) around the anomaly timestamp.
     # This would require more complex S3 object listing/filtering.
@@ -110,10 +183,17 @@ def get_contextual_data(resource_id: str, anomaly_details: dict) -> str:
     return "\n".join(context_data)
 
 def load_prompt_template(bucket_name: str, key: str) -> str:
-    """Loads the prompt template from S3."""
+    """
+    Loads the prompt template from S3.
+    Templates are cached per container, so only the first (cold) invocation pays for the S3 GET.
+    """
+    cache_key = (bucket_name, key)
+    if cache_key in prompt_template_cache:
+        return prompt_template_cache[cache_key]
     try:
         response = s3_client.get_object(Bucket=bucket_name, Key=key)
-        return response['Body'].read().decode('utf-8')
+        prompt_template_cache[cache_key] = response['Body'].read().decode('utf-8')
+        return prompt_template_cache[cache_key]
     except ClientError as e:
         logger.error(f"Failed to load prompt template from s3://{bucket_name}/{key}: {e}")
         raise
@@ -124,8 +204,10 @@ def load_prompt_template(bucket_name: str, key: str) -> str:
 def invoke_bedrock_llm(model_id: str, prompt: str) -> str:
     """
     Invokes a Large Language Model (LLM) via Amazon Bedrock.
+    The response is streamed and the completion deltas are accumulated as they arrive,
+    so only one chunk is buffered at a time and stream errors surface immediately.
     """
-    body = json.dumps({
+    body = orjson.dumps({
         "prompt": f"\n\nHuman: {prompt}\n\nAssistant:",
         "max_tokens_to_sample": 1000, # Adjust as needed
         "temperature": 0.1,
@@ -133,14 +215,19 @@ def invoke_bedrock_llm(model_id: str, prompt: str) -> str:
     })
 
     try:
-        response = bedrock_runtime.invoke_model(
+        response = bedrock_runtime.invoke_model_with_response_stream(
             modelId=model_id,
             contentType="application/json",
             accept="application/json",
             body=body
         )
-        response_body = json.loads(response.get('body').read())
-        return response_body.get('completion')
+        completion_parts = []
+        # Error events in the stream are raised by botocore as EventStreamError (a ClientError)
+        for stream_event in response.get('body'):
+            chunk = stream_event.get('chunk')
+            if chunk:
+                completion_parts.append(orjson.loads(chunk['bytes']).get('completion', ''))
+        return "".join(completion_parts)
     except ClientError as e:
         logger.error(f"Bedrock invocation failed: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
         raise
@@ -152,9 +239,8 @@ def publish_enriched_alert(subject: str, message: str):
     """
     Publishes an enriched alert message to the SNS topic.
     """
-    sns = boto3.client('sns')
     try:
-        sns.publish(
+        sns_client.publish(
             TopicArn=SNS_ANOMALY_TOPIC_ARN,
             Subject=subject,
             Message=message
@@ -167,6 +253,14 @@ def publish_enriched_alert(subject: str, message: str):
         logger.error(f"An unexpected error occurred during SNS publish: {e}", exc_info=True)
         raise
 
+# Provisioned-concurrency containers pre-load the prompt template during INIT, which also
+# opens the S3 connection, so the first analysis starts warm
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency' and PROCESSED_DATA_BUCKET:
+    try:
+        load_prompt_template(PROCESSED_DATA_BUCKET, PROMPT_TEMPLATE_KEY)
+    except Exception as e:
+        logger.warning(f"Could not pre-load prompt template during init: {e}")
+
 def lambda_handler(event, context):
     """
     Lambda handler function for Bedrock Analyzer.
@@ -207,11 +301,13 @@ def lambda_handler(event, context):
             logger.warning(f"No additional context found for {resource_id}. Proceeding with limited context.")
 
         # 3. Construct the Full Prompt
+        # Pretty-print the anomaly details once; the same text goes into the prompt and the alert
+        details_pretty = orjson.dumps(anomaly_details, option=orjson.OPT_INDENT_2).decode('utf-8')
         full_prompt = prompt_template.format(
             anomaly_type=anomaly_type,
             resource_id=resource_id,
             cost_impact=cost_impact,
-            anomaly_details=json.dumps(anomaly_details, indent=2),
+            anomaly_details=details_pretty,
             context_data=context_data
         )
         logger.info(f"Full prompt for Bedrock (first 500 chars): {full_prompt[:500]}...")
@@ -221,15 +317,15 @@ def lambda_handler(event, context):
         logger.info(f"Bedrock LLM response (first 500 chars): {llm_response_text[:500]}...")
 
         # 5. Publish Enriched Alert
-        subject = f"Egress Anomaly Detected: {anomaly_type} on {resource_id}"
-        message = f"An egress cost anomaly has been detected.\n\n" \
-                  f"Anomaly Type: {anomaly_type}\n" \
-                  f"Resource ID: {resource_id}\n" \
-                  f"Cost Impact: ${cost_impact}\n\n" \
-                  f"--- AI-Powered Root Cause Analysis & Recommendations ---\n" \
-                  f"{llm_response_text}\n\n" \
-                  f"--- Raw Anomaly Details ---\n" \
-                  f"{json.dumps(anomaly_details, indent=2)}"
+        alert_fields = {
+            'anomaly_type': anomaly_type,
+            'resource_id': resource_id,
+            'cost_impact': cost_impact,
+            'llm_analysis': llm_response_text,
+            'anomaly_details': details_pretty
+        }
+        subject = ALERT_SUBJECT_TEMPLATE.format_map(alert_fields)
+        message = ALERT_MESSAGE_TEMPLATE.format_map(alert_fields)
 
         publish_enriched_alert(subject, message)
 
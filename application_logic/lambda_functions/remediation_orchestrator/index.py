@@ -5,20 +5,40 @@ import json
 import os
 import logging
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Reuse connections across warm invocations and retry throttled remediation calls
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    connect_timeout=2,
+    read_timeout=15
+)
+
 # AWS SDK clients
-s3_client = boto3.client('s3')
-ec2_client = boto3.client('ec2')
-sns_client = boto3.client('sns')
+s3_client = boto3.client('s3', config=BOTO_CONFIG)
+ec2_client = boto3.client('ec2', config=BOTO_CONFIG)
+sns_client = boto3.client('sns', config=BOTO_CONFIG)
 
 # Environment variables
 SNS_ANOMALY_TOPIC_ARN = os.environ.get('SNS_ANOMALY_TOPIC_ARN')
 
+# SNS remediation status notification templates
+STATUS_SUBJECT_TEMPLATE = "Egress Remediation Status: {status_upper} for {action} on {resource_id}"
+STATUS_MESSAGE_TEMPLATE = (
+    "Remediation Action: {action}\n"
+    "Resource ID: {resource_id}\n"
+    "Status: {status}\n"
+    "Message: {message}\n"
+    "Anomaly Details: {anomaly_details}"
+)
+
 def remediate_s3_public_access(resource_id: str):
     """
     Remediates S3 bucket public access by blocking all public access settings.
@@ -84,6 +104,20 @@ def remediate_security_group(resource_id: str):
         logger.error(f"An unexpected error occurred during SG remediation for {sg_id}: {e}", exc_info=True)
         raise
 
+def build_status_notification(action: str, resource_id: str, remediation_result: dict, anomaly_details: dict):
+    """
+    Builds the (subject, message) pair for a remediation status notification.
+    """
+    status_fields = {
+        'action': action,
+        'resource_id': resource_id,
+        'status': remediation_result['status'],
+        'status_upper': remediation_result['status'].upper(),
+        'message': remediation_result['message'],
+        'anomaly_details': json.dumps(anomaly_details, indent=2)
+    }
+    return STATUS_SUBJECT_TEMPLATE.format_map(status_fields), STATUS_MESSAGE_TEMPLATE.format_map(status_fields)
+
 def lambda_handler(event, context):
     """
     Lambda handler function for Remediation Orchestrator.
@@ -121,12 +155,7 @@ def lambda_handler(event, context):
             remediation_result = {"status": "skipped", "message": f"Unknown action '{action}'."}
 
         # Publish remediation status to SNS
-        subject = f"Egress Remediation Status: {remediation_result['status'].upper()} for {action} on {resource_id}"
-        message = f"Remediation Action: {action}\n" \
-                  f"Resource ID: {resource_id}\n" \
-                  f"Status: {remediation_result['status']}\n" \
-                  f"Message: {remediation_result['message']}\n" \
-                  f"Anomaly Details: {json.dumps(anomaly_details, indent=2)}"
+        subject, message = build_status_notification(action, resource_id, remediation_result, anomaly_details)
         sns_client.publish(TopicArn=SNS_ANOMALY_TOPIC_ARN, Subject=subject, Message=message)
 
         return {
@@ -3,12 +3,13 @@
 # It is designed to be run as an AWS
 
 import sys
+import ipaddress
 from awsglue.transforms import * # type: ignore
 from awsglue.utils import getResolvedOptions # type: ignore
 from pyspark import SparkContext
 from awsglue.context import GlueContext # type: ignore
 from awsglue.job import Job # type: ignore
-from pyspark.sql.functions import col, lit, sum as spark_sum, from_unixtime, to_timestamp, hour, dayofmonth, month, year, concat_ws, expr, when, to_date
+from pyspark.sql.functions import col, lit, sum as spark_sum, from_unixtime, to_timestamp, hour, concat_ws, expr, to_date, split, count, broadcast
 
 # Initialize Glue context
 args = getResolvedOptions(sys.argv, [
@@ -19,6 +20,9 @@ args = getResolvedOptions(sys.argv, [
     'target_path'   # S3 path prefix within target_bucket for output
 ])
 
+# Optional: process a single day. --run_date (YYYY-MM-DD) selects the flow log year/month/day partition.
+RUN_DATE = getResolvedOptions(sys.argv, ['run_date'])['run_date'] if '--run_date' in sys.argv else None
+
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
@@ -35,14 +39,36 @@ GLUE_DATABASE = "egress_cost_optimizer_raw_logs_db" # Matches Glue database name
 
 # --- Read VPC Flow Logs data from Glue Data Catalog ---
 # VPC Flow Logs are typically partitioned by year, month, day, hour.
+# With a run date, the partition filter is resolved against the catalog so only that day's
+# S3 prefixes are listed and read. Flow log prefixes use zero-padded months and days (2024/01/05).
+flow_log_partition_predicate = ""
+if RUN_DATE:
+    run_year, run_month, run_day = RUN_DATE.split('-')
+    flow_log_partition_predicate = f"year='{run_year}' and month='{run_month}' and day='{run_day}'"
+
 datasource = glueContext.create_dynamic_frame.from_catalog(
     database=GLUE_DATABASE,
     table_name=SOURCE_TABLE,
+    push_down_predicate=flow_log_partition_predicate,
     transformation_ctx="datasource_flow_logs"
 )
 
 # Convert to Spark DataFrame
-df_flow_logs = datasource.toDF()
+# Project only the fields used below and cast them once here: the counters to long, and 'start'
+# (epoch seconds) straight to a timestamp so the date and hour are derived from one column.
+df_flow_logs = datasource.toDF().select(
+    col("start").cast("long").cast("timestamp").alias("start_ts"),
+    col("bytes").cast("long").alias("bytes"),
+    col("packets").cast("long").alias("packets"),
+    col("srcaddr"),
+    col("dstaddr"),
+    col("dstport").cast("int").alias("dstport"),
+    col("protocol").cast("int").alias("protocol"),
+    col("vpc_id"),
+    col("instance_id"),
+    col("interface_id"),
+    col("action")
+)
 
 # --- Pre-processing and Feature Extraction ---
 # Filter for 'REJECT' (denied) and 'ACCEPT' (allowed) traffic
@@ -50,16 +76,31 @@ df_flow_logs = datasource.toDF()
 # This requires knowing your VPC CIDR ranges. For simplicity, we'll assume external IPs are not in private ranges.
 # A more robust solution would involve looking up VPC CIDRs.
 
-# Common private IP ranges (RFC 1918)
+# Common private IP ranges (RFC 1918), plus shared address space used by carrier-grade NAT
+# (RFC 6598) and link-local addresses, none of which is billed as internet egress.
 private_ip_ranges = [
     "10.0.0.0/8",
     "172.16.0.0/12",
-    "192.168.0.0/16"
+    "192.168.0.0/16",
+    "100.64.0.0/10",
+    "169.254.0.0/16"
 ]
-
-# Function to check if IP is private (conceptual, would need UDF or more complex Spark logic)
+# Optional: your own VPC / on-premises CIDRs, comma separated (e.g. --internal_cidrs 100.70.0.0/16,203.0.113.0/24)
+if '--internal_cidrs' in sys.argv:
+    private_ip_ranges += getResolvedOptions(sys.argv, ['internal_cidrs'])['internal_cidrs'].split(',')
+
+# The ranges become a tiny (start, end) table of 32-bit integers that is broadcast to every executor.
+# dstaddr is converted to an integer once per row and anti-joined against it; this stays in Spark's
+# generated code (no UDF or substring matching). Only IPv4 networks fit the long range columns.
+internal_networks = [ipaddress.ip_network(cidr.strip()) for cidr in private_ip_ranges]
+ipv6_networks = [str(network) for network in internal_networks if network.version != 4]
+if ipv6_networks:
+    raise ValueError(f"--internal_cidrs accepts IPv4 networks only, got: {', '.join(ipv6_networks)}")
+df_internal_ranges = spark.createDataFrame(
+    [(int(network.network_address), int(network.broadcast_address)) for network in internal_networks],
+    "range_start long, range_end long"
+)
 # For simplicity, we'll assume traffic where srcaddr is private and dstaddr is public is egress.
-# In a real scenario, you'd use a more robust IP range check.
 # You might also need to join with EC2 instance metadata or ENI details to identify the specific resource.
 
 df_flow_logs_filtered = df_flow_logs.filter(
@@ -71,19 +112,30 @@ df_flow_logs_filtered = df_flow_logs.filter(
 # This is a simplified heuristic: if the destination IP is NOT a private IP, it's considered egress.
 # This requires careful consideration of your network topology (e.g., VPNs, Direct Connect).
 # A more accurate approach would involve checking if dstaddr is outside your known VPC CIDRs.
-df_egress_flows = df_flow_logs_filtered.withColumn("is_egress",
-    when(
-        (col("dstaddr").substr(0, 3).isin("10.", "172", "192").isNull()) |
-        (col("dstaddr").substr(0, 3).isin("172") & (col("dstaddr").substr(4, 2).cast("int") < 16 | col("dstaddr").substr(4, 2).cast("int") > 31)),
-        lit(1)
-    ).otherwise(lit(0))
-).filter(col("is_egress") == 1)
+# The left_anti join keeps only flows whose destination falls in none of the internal ranges.
+# IPv6 destinations have a null dst_ip_int, so the range condition never matches and they are kept
+# as egress; malformed IPv4 addresses (also null) are dropped first.
+df_egress_flows = df_flow_logs_filtered \
+    .withColumn("dst_octets", split(col("dstaddr"), "\\.")) \
+    .withColumn("dst_ip_int",
+        col("dst_octets").getItem(0).cast("long") * 16777216 +
+        col("dst_octets").getItem(1).cast("long") * 65536 +
+        col("dst_octets").getItem(2).cast("long") * 256 +
+        col("dst_octets").getItem(3).cast("long")
+    ) \
+    .filter(col("dst_ip_int").isNotNull() | col("dstaddr").contains(":")) \
+    .join(
+        broadcast(df_internal_ranges),
+        col("dst_ip_int").between(col("range_start"), col("range_end")),
+        "left_anti"
+    ) \
+    .drop("dst_octets")
 
 
 # Extract relevant features and aggregate
 df_aggregated_flows = df_egress_flows.groupBy(
-        to_date(from_unixtime(col("start"))).alias("flow_date"), # Convert Unix timestamp to date
-        hour(from_unixtime(col("start"))).alias("flow_hour"), # Hour of the day
+        to_date(col("start_ts")).alias("flow_date"), # Date of the flow start
+        hour(col("start_ts")).alias("flow_hour"), # Hour of the day
         col("srcaddr").alias("source_ip"),
         col("dstaddr").alias("destination_ip"),
         col("dstport").alias("destination_port"),
@@ -95,24 +147,26 @@ df_aggregated_flows = df_egress_flows.groupBy(
     .agg(
         spark_sum(col("bytes")).alias("total_egress_bytes"),
         spark_sum(col("packets")).alias("total_egress_packets"),
-        lit(1).alias("flow_count") # Count of unique flows
-    ) \
-    .orderBy("flow_date", "flow_hour", "total_egress_bytes")
+        count(lit(1)).alias("flow_count") # Number of flow records aggregated into this group
+    )
 
 # Add a processing timestamp
 df_aggregated_flows = df_aggregated_flows.withColumn("processing_timestamp", from_unixtime(lit(job.started_on / 1000)))
 
 # --- Write Processed Data to S3 (Parquet format) ---
-# Partition by year, month, day, hour for efficient querying.
+# Partition by date and hour for efficient querying.
+# Repartitioning on the output partition keys sends each date/hour to a single task, so every
+# S3 partition gets one file instead of one small file per shuffle partition.
+# A per-partition sort (no global shuffle) clusters rows so Parquet min/max stats can prune on read.
+# Written with zstd (smaller than snappy for the IP/port columns) and explicit dictionary encoding.
 output_path = f"s3://{TARGET_BUCKET}/{TARGET_PATH}"
-df_aggregated_flows.write \
+df_aggregated_flows.repartition(col("flow_date"), col("flow_hour")) \
+    .sortWithinPartitions("flow_date", "flow_hour", "destination_ip") \
+    .write \
+    .option("compression", "zstd") \
+    .option("parquet.enable.dictionary", "true") \
     .mode("append") \
-    .partitionBy(
-        year(col("flow_date")),
-        month(col("flow_date")),
-        dayofmonth(col("flow_date")),
-        col("flow_hour")
-    ) \
+    .partitionBy("flow_date", "flow_hour") \
     .parquet(output_path)
 
 logger.info(f"Successfully processed VPC Flow Logs and wrote to {output_path}")
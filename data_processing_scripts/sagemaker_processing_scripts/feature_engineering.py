@@ -5,8 +5,11 @@
 import argparse
 import os
 import logging
+import json
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+import pyarrow.dataset as ds
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import numpy as np
@@ -16,6 +19,9 @@ import joblib
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Width of the hashed encoding shared by the high-cardinality categorical columns
+HASHED_CATEGORY_FEATURES = 32
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
 
@@ -25,26 +31,41 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
-    input_files = [os.path.join(args.input_data_dir, file) for file in os.listdir(args.input_data_dir)]
-    if not input_files:
+    if not os.listdir(args.input_data_dir):
         raise ValueError('No input files found for processing.')
 
     # Assuming input data is Parquet from Glue jobs (CUR and Flow Logs)
     # This script would typically combine and join data from different sources
     # For simplicity, we'll assume a single input for now, but in reality,
     # you'd have multiple input channels for different data sources.
-    df = pd.concat([pd.read_parquet(file) for file in input_files])
+    # Read every file into one contiguous Arrow table (only the columns used below) and hand its
+    # buffers to pandas, instead of building one DataFrame per file and concatenating them.
+    # The directory is scanned recursively; hive-style partition folders (e.g. usage_date=2024-01-01/)
+    # contribute their key as a column.
+    input_columns = ['usage_date', 'service_code', 'region', 'usage_type',
+                     'daily_egress_cost_usd', 'daily_egress_usage_amount']
+    dataset = ds.dataset(args.input_data_dir, format='parquet', partitioning='hive')
+    df = dataset.to_table(columns=input_columns).to_pandas(self_destruct=True)
     logger.info(f"Loaded {len(df)} rows for feature engineering.")
 
     # --- Feature Engineering Steps ---
 
     # 1. Time-based features (from 'usage_date' or 'flow_date')
+    # Derived in one pass with integer arithmetic on the day-resolution dates rather than
+    # one .dt accessor round trip per feature. Stored as int8 (all values fit).
     df['date'] = pd.to_datetime(df['usage_date']) # Assuming 'usage_date' from CUR
-    df['day_of_week'] = df['date'].dt.dayofweek # Monday=0, Sunday=6
-    df['day_of_month'] = df['date'].dt.day
-    df['month'] = df['date'].dt.month
-    df['week_of_year'] = df['date'].dt.isocalendar().week.astype(int)
-    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    dates = df['date'].values.astype('datetime64[D]')
+    epoch_days = dates.view('int64')
+    month_starts = dates.astype('datetime64[M]')
+    day_of_week = (epoch_days + 3) % 7 # 1970-01-01 was a Thursday; Monday=0, Sunday=6
+    # ISO week: the week's Thursday decides the ISO year; count weeks from that year's Jan 1
+    thursdays = dates - day_of_week + 3
+    iso_year_starts = thursdays.astype('datetime64[Y]').astype('datetime64[D]')
+    df['day_of_week'] = day_of_week.astype(np.int8)
+    df['day_of_month'] = ((dates - month_starts).astype('int64') + 1).astype(np.int8)
+    df['month'] = (month_starts.view('int64') % 12 + 1).astype(np.int8)
+    df['week_of_year'] = ((thursdays - iso_year_starts).astype('int64') // 7 + 1).astype(np.int8)
+    df['is_weekend'] = (day_of_week >= 5).astype(np.int8)
 
     # 2. Lag features (e.g., egress from previous day/week)
     # This requires sorting and grouping, which can be complex for a generic script.
@@ -57,41 +78,59 @@ if __name__ == '__main__':
     # Requires total bytes, which might come from another data source or aggregation.
 
     # 4. Categorical features encoding (e.g., 'service_code', 'region', 'usage_type')
-    categorical_features = ['service_code', 'region', 'usage_type', 'day_of_week', 'month']
+    # The open-ended columns are hashed into a fixed number of columns, so the feature width (and the
+    # preprocessor) does not grow with the number of services/regions/usage types seen.
+    # The small, bounded calendar columns keep one-hot encoding.
+    hashed_features = ['service_code', 'region', 'usage_type']
+    categorical_features = ['day_of_week', 'month']
     numerical_features = ['daily_egress_cost_usd', 'daily_egress_usage_amount'] # Features for anomaly detection
+    # float32 is plenty of precision for scaled costs/amounts and halves the memory the scaler works on
+    df[numerical_features] = df[numerical_features].astype(np.float32)
+
+    # Rows are turned into {column: value} dicts so each value is hashed together with its column
+    # name ('region=us-east-1'), keeping equal values in different columns apart. FeatureHasher is
+    # stateless, so unseen categories at inference time need no special handling. Values are cast to
+    # str inside the pipeline (FeatureHasher treats non-str dict values as numbers), so the saved
+    # preprocessor applies the same cast when it is reused.
+    category_hasher = Pipeline(steps=[
+        ('to_strings', FunctionTransformer(pd.DataFrame.astype, kw_args={'dtype': str})),
+        ('to_records', FunctionTransformer(pd.DataFrame.to_dict, kw_args={'orient': 'records'})),
+        ('hash', FeatureHasher(n_features=HASHED_CATEGORY_FEATURES, input_type='dict',
+                               alternate_sign=False, dtype=np.float32))
+    ])
 
     # Create a preprocessor pipeline for numerical and categorical features
+    # sparse_threshold=1.0 keeps the combined output sparse regardless of its overall density,
+    # so the one-hot block is never materialized as a dense matrix.
     preprocessor = ColumnTransformer(
         transformers=[
             ('num', StandardScaler(), numerical_features),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-        ])
+            ('hash', category_hasher, hashed_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore', dtype=np.float32), categorical_features)
+        ],
+        sparse_threshold=1.0)
 
     logger.info("Fitting preprocessor and transforming data...")
     # Fit and transform the data
-    transformed_data = preprocessor.fit_transform(df)
-
-    # Ensure transformed_data is a dense NumPy array before creating DataFrame
-    # ColumnTransformer can return a sparse matrix if OneHotEncoder is used and sparse_output=True (default in newer versions)
-    # or if any transformer returns sparse output.
-    if scipy.sparse.issparse(transformed_data):
-        transformed_data = transformed_data.toarray()
-    # If it's already a numpy array, no conversion is needed.
+    transformed_data = scipy.sparse.csr_matrix(preprocessor.fit_transform(df))
 
-    # Get feature names after one-hot encoding
-    # Ensure preprocessor.named_transformers_['cat'] is an OneHotEncoder before calling get_feature_names_out
+    # Get feature names after encoding
+    # Hashed columns have no meaningful names; they are numbered in transformer output order.
+    hashed_feature_names = [f"hashed_category_{i}" for i in range(HASHED_CATEGORY_FEATURES)]
     ohe_feature_names = preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features)
-    all_feature_names = numerical_features + list(ohe_feature_names)
+    all_feature_names = numerical_features + hashed_feature_names + list(ohe_feature_names)
 
-    # Convert transformed data back to DataFrame
-    df_transformed = pd.DataFrame(transformed_data, columns=all_feature_names)
-    logger.info(f"Transformed data shape: {df_transformed.shape}")
-    logger.info(df_transformed.head())
+    logger.info(f"Transformed data shape: {transformed_data.shape} "
+                f"({transformed_data.nnz} non-zero values)")
 
     # --- Save Processed Features ---
     # Save the processed features to the output directory, which SageMaker will upload to S3.
-    output_path = os.path.join(args.output_data_dir, 'processed_features.parquet')
-    df_transformed.to_parquet(output_path, index=False)
+    # The matrix is written as a sparse CSR .npz (only the non-zero values are stored) and the
+    # column names alongside it, instead of densifying the one-hot columns into a Parquet file.
+    output_path = os.path.join(args.output_data_dir, 'processed_features.npz')
+    scipy.sparse.save_npz(output_path, transformed_data)
+    with open(os.path.join(args.output_data_dir, 'feature_names.json'), 'w') as f:
+        json.dump(all_feature_names, f)
     logger.info(f"Processed features saved to {output_path}")
 
     # Optional: Save the preprocessor object if it needs to be reused for inference
@@ -75,6 +75,7 @@ resource "aws_glue_crawler" "cur_crawler" {
 resource "aws_glue_job" "cur_parser_job" {
   name            = "${var.project_name}-cur-parser-job"
   role_arn        = var.glue_iam_role_arn
+  glue_version    = "4.0" # Spark 3.3: native zstd Parquet codec
   command {
     script_location = "${var.s3_model_artifacts_bucket_arn}/glue_scripts/cur_parser.py" # Script location in S3
     python_version  = "3"
@@ -103,6 +104,7 @@ resource "aws_glue_job" "cur_parser_job" {
 resource "aws_glue_job" "flow_log_aggregator_job" {
   name            = "${var.project_name}-flow-log-aggregator-job"
   role_arn        = var.glue_iam_role_arn
+  glue_version    = "4.0" # Spark 3.3: native zstd Parquet codec
   command {
     script_location = "${var.s3_model_artifacts_bucket_arn}/glue_scripts/flow_log_aggregator.py" # Script location in S3
     python_version  = "3"
@@ -2,11 +2,14 @@
 
 import os
 import json
+import orjson
 import logging
 import pandas as pd
 import joblib # For loading scikit-learn models
 import numpy as np # For numerical operations
-import io # For handling CSV input
+import pyarrow as pa
+import pyarrow.csv as pacsv # For parsing CSV input
+import pyarrow.json as pajson # For parsing JSON Lines input
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -27,6 +30,12 @@ def model_fn(model_dir):
         logger.error(f"Error loading model from {model_dir}: {e}")
         raise
 
+def to_bytes(request_body):
+    """
+    Returns the request body as bytes for the Arrow readers (the serving stack may pass str or bytes).
+    """
+    return request_body.encode('utf-8') if isinstance(request_body, str) else request_body
+
 def input_fn(request_body, request_content_type):
     """
     Deserializes the input data from the request body into a Pandas DataFrame.
@@ -40,14 +49,20 @@ def input_fn(request_body, request_content_type):
         df = pd.DataFrame(data)
         logger.info(f"JSON input parsed. DataFrame shape: {df.shape}")
         return df
+    elif request_content_type == 'application/jsonlines':
+        # One JSON object per line; parsed by Arrow's multithreaded C++ reader straight into columns
+        df = pajson.read_json(pa.BufferReader(to_bytes(request_body))).to_pandas()
+        logger.info(f"JSON Lines input parsed. DataFrame shape: {df.shape}")
+        return df
     elif request_content_type == 'text/csv':
         # Assuming CSV input with headers, or without if you handle columns explicitly
-        df = pd.read_csv(io.StringIO(request_body))
+        # Arrow's CSV reader builds typed columns directly instead of going through Python objects per cell
+        df = pacsv.read_csv(pa.BufferReader(to_bytes(request_body))).to_pandas()
         logger.info(f"CSV input parsed. DataFrame shape: {df.shape}")
         return df
     else:
         raise ValueError(f"Unsupported content type: {request_content_type}. "
-                         "This endpoint supports 'application/json' and 'text/csv'.")
+                         "This endpoint supports 'application/json', 'application/jsonlines' and 'text/csv'.")
 
 def predict_fn(input_data, model):
     """
@@ -56,36 +71,57 @@ def predict_fn(input_data, model):
     The Isolation Forest model's `predict` method returns -1 for outliers and 1 for inliers.
     """
     logger.info(f"Received input data for prediction. Shape: {input_data.shape}")
-    # Ensure input data has the same numerical features as used during training
-    # Select only numerical columns for prediction, matching the training script's feature selection.
-    features_for_prediction = input_data.select_dtypes(include=np.number)
+    # Ensure input data has the same numerical features as used during training.
+    # A model fitted on a DataFrame records its columns in feature_names_in_, so use those directly;
+    # otherwise select only numerical columns, matching the training script's feature selection.
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        features_for_prediction = input_data[feature_names]
+    else:
+        features_for_prediction = input_data.select_dtypes(include=np.number)
     if features_for_prediction.empty:
         raise ValueError("No numerical features found in input data for prediction. Check input schema.")
 
-    predictions = model.predict(features_for_prediction)
+    # Walk the trees once: predict() is just decision_function() < 0 (-1 for outlier, 1 for inlier),
+    # so derive the label from the scores instead of scoring every row twice.
+    anomaly_scores = model.decision_function(features_for_prediction) # Lower score means more anomalous
 
-    # Convert Isolation Forest output (-1 for outlier, 1 for inlier) to a more intuitive format (1 for anomaly, 0 for normal).
-    is_anomaly = (predictions == -1).astype(int)
+    # Convert to a more intuitive format (1 for anomaly, 0 for normal).
+    is_anomaly = (anomaly_scores < 0).astype(np.int8)
     logger.info(f"Predictions generated. Anomalies detected: {np.sum(is_anomaly)}")
 
     # Return a DataFrame or Series that includes original data and anomaly score
     # This allows the calling Lambda to get context.
     input_data['is_anomaly'] = is_anomaly
-    input_data['anomaly_score'] = model.decision_function(features_for_prediction) # Lower score means more anomalous
+    input_data['anomaly_score'] = anomaly_scores
 
     return input_data # Return the DataFrame with added prediction columns
 
+def serialize_default(value):
+    """
+    orjson fallback for values it does not serialize natively, mainly pandas Timestamps from date
+    columns (the Arrow readers parse ISO date strings into datetime64). NaT becomes null.
+    """
+    if value is pd.NaT:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
 def output_fn(prediction_output, accept_content_type):
     """
     Serializes the prediction result to the desired content type.
     This function is called after predict_fn.
     """
     if accept_content_type == 'application/json':
-        # Convert the DataFrame output to JSON
-        return prediction_output.to_json(orient='records'), accept_content_type
+        # Convert the DataFrame output to JSON (orjson serializes the records in C, straight to bytes)
+        records = prediction_output.to_dict(orient='records')
+        return orjson.dumps(records, default=serialize_default, option=orjson.OPT_SERIALIZE_NUMPY), accept_content_type
     elif accept_content_type == 'text/csv':
-        # Convert the DataFrame output to CSV
-        return prediction_output.to_csv(index=False), accept_content_type
+        # Convert the DataFrame output to CSV with Arrow's vectorized writer
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(pa.Table.from_pandas(prediction_output, preserve_index=False), sink)
+        return sink.getvalue().to_pybytes(), accept_content_type
     else:
         raise ValueError(f"Unsupported accept type: {accept_content_type}. "
                          "This endpoint supports 'application/json' and 'text/csv'.")
\ No newline at end of file
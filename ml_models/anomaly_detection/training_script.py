@@ -3,11 +3,13 @@
 import argparse
 import os
 import logging
-import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 from sklearn.ensemble import IsolationForest
 import joblib # For saving/loading scikit-learn models
 import json
 import numpy as np
+import scipy.sparse
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -40,23 +42,36 @@ if __name__ == '__main__':
     if not input_files:
         raise ValueError('No input files found in the training channel. Ensure data is correctly passed.')
 
-    # Concatenate all Parquet files in the input directory.
-    # Assuming the processed features are in Parquet format.
+    # The processing job writes the features as a sparse CSR matrix (processed_features.npz).
+    # Parquet files are still accepted for feature sets produced elsewhere.
+    npz_files = [file for file in input_files if file.endswith('.npz')]
     try:
-        df = pd.concat([pd.read_parquet(file) for file in input_files])
-        logger.info(f"Loaded {len(df)} rows for training from {len(input_files)} files.")
+        if npz_files:
+            # IsolationForest accepts sparse input directly, so the matrix is never densified.
+            features = scipy.sparse.vstack([scipy.sparse.load_npz(file) for file in npz_files], format='csr')
+            logger.info(f"Loaded {features.shape[0]} rows for training from {len(npz_files)} files.")
+        else:
+            # One Arrow dataset scan over all files avoids a DataFrame per file plus a full-copy concat.
+            # The channel is scanned recursively (hive-style partition folders included) and files
+            # that are not Parquet are skipped.
+            dataset = ds.dataset(args.train, format='parquet', partitioning='hive', exclude_invalid_files=True)
+            # --- Prepare features for the model ---
+            # The Isolation Forest model expects numerical features.
+            # The 'feature_engineering.py' script should have already transformed categorical features
+            # and scaled numerical ones.
+            # Pick the numerical columns from the Parquet schema so the other columns are never read.
+            numeric_columns = [field.name for field in dataset.schema
+                               if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)]
+            features = dataset.to_table(columns=numeric_columns).to_pandas(self_destruct=True)
+            logger.info(f"Loaded {len(features)} rows for training from {len(dataset.files)} files.")
     except Exception as e:
         logger.error(f"Error loading training data: {e}")
         raise
 
-    # --- Prepare features for the model ---
-    # The Isolation Forest model expects numerical features.
-    # The 'feature_engineering.py' script should have already transformed categorical features
-    # and scaled numerical ones.
-    # We assume all columns in the input DataFrame are features for the model.
-    features = df.select_dtypes(include=np.number) # Select only numerical columns for Isolation Forest
-    if features.empty:
+    if features.shape[0] == 0 or features.shape[1] == 0:
         raise ValueError("No numerical features found in the training data. Check feature engineering output.")
+    # IsolationForest works in float32 internally; converting up front avoids a float64 copy during fit.
+    features = features.astype(np.float32, copy=False)
 
     # Initialize and train the Isolation Forest model
     logger.info(f"Training Isolation Forest model with hyperparameters: "
@@ -64,7 +79,8 @@ if __name__ == '__main__':
     model = IsolationForest(
         n_estimators=args.n_estimators,
         contamination=args.contamination,
-        random_state=args.random_state
+        random_state=args.random_state,
+        n_jobs=-1 # Trees are independent; build them on all available vCPUs
     )
     model.fit(features)
     logger.info("Model training complete.")
@@ -1,122 +1,207 @@
 import argparse
 import boto3
 import os
-import random
 import datetime
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
 import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def generate_cur_egress_data(num_records, start_date, project_name):
+# Multipart settings for uploading large simulated files
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
+# Connection pool sized above the transfer concurrency so multipart threads never wait on a connection
+BOTO_CONFIG = Config(
+    max_pool_connections=25,
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    tcp_keepalive=True
+)
+
+# S3 client, created on first use and then reused for every upload in this process.
+# Created lazily (not at import) so each worker process builds its own client.
+s3_client = None
+
+def get_s3_client():
+    """Returns the process-wide S3 client, creating it on first use."""
+    global s3_client
+    if s3_client is None:
+        s3_client = boto3.client('s3', config=BOTO_CONFIG)
+    return s3_client
+
+def ipv4_to_strings(ip_ints):
+    """Formats an array of IPv4 addresses held as uint32 into dotted-quad strings."""
+    ip_strings = ((ip_ints >> 24) & 0xFF).astype('U3')
+    for shift in (16, 8, 0):
+        ip_strings = np.char.add(np.char.add(ip_strings, "."), ((ip_ints >> shift) & 0xFF).astype('U3'))
+    return ip_strings
+
+def generate_cur_egress_data(num_records, start_date, project_name, rng):
     """
     Generates synthetic AWS Cost and Usage Report (CUR) data for egress.
     This is a simplified representation of CUR.
+    All random values are drawn from the given numpy Generator (rng); returns a PyArrow Table.
     """
-    data = []
     services = ["Amazon Elastic Compute Cloud", "Amazon S3", "Amazon CloudFront", "Amazon RDS"]
     usage_types = ["DataTransfer-Out-Bytes", "CloudFront-Bytes-Out", "S3-Bytes-Out"]
     regions = ["us-east-1", "us-west-2", "eu-central-1"]
-    
-    for _ in range(num_records):
-        date = start_date + datetime.timedelta(days=random.randint(0, 29)) # Data for 30 days
-        service = random.choice(services)
-        usage_type = random.choice(usage_types)
-        region = random.choice(regions)
-        
-        # Simulate normal daily egress cost (e.g., $0.05 to $5)
-        cost = round(random.uniform(0.05, 5.0), 4)
-        # Simulate usage amount in bytes (e.g., 1MB to 100MB)
-        usage_amount = random.randint(1024 * 1024, 100 * 1024 * 1024) 
-        
-        # Introduce a spike for a specific service/day to simulate anomaly
-        if random.random() < 0.05: # 5% chance of an anomaly
-            cost *= random.uniform(5, 20) # 5x to 20x spike
-            usage_amount *= random.randint(5, 20)
-            logger.info(f"Simulating anomaly: {service} on {date.strftime('%Y-%m-%d')} with cost {cost:.2f}")
-
-        data.append({
-            "line_item_usage_start_date": date.strftime('%Y-%m-%d %H:%M:%S'),
-            "line_item_usage_end_date": (date + datetime.timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
-            "line_item_usage_type": usage_type,
-            "line_item_unblended_cost": cost,
-            "line_item_usage_amount": usage_amount,
-            "product_servicecode": service.replace("Amazon ", ""),
-            "product_region": region,
-            "line_item_resource_id": f"arn:aws:{service.lower().replace('amazon ', '').replace(' ', '')}:{region}:123456789012:resource-{random.randint(1000,9999)}"
-        })
-    
-    df = pd.DataFrame(data)
-    return df
 
-def generate_flow_log_data(num_records, start_time, vpc_id, project_name):
+    # Every column is drawn in a single batched call instead of one Python-level draw per record.
+    # Category indices are drawn as int8 so they can be used as dictionary indices without conversion
+    service_idx = rng.integers(0, len(services), num_records, dtype=np.int8)
+    usage_type_idx = rng.integers(0, len(usage_types), num_records, dtype=np.int8)
+    region_idx = rng.integers(0, len(regions), num_records, dtype=np.int8)
+    service_arr = np.asarray(services)[service_idx]
+    region_arr = np.asarray(regions)[region_idx]
+    dates = np.datetime64(start_date, 'D') + rng.integers(0, 30, num_records) # Data for 30 days
+
+    # Simulate normal daily egress cost (e.g., $0.05 to $5)
+    cost = rng.uniform(0.05, 5.0, num_records).round(4)
+    # Simulate usage amount in bytes (e.g., 1MB to 100MB)
+    usage_amount = rng.integers(1024 * 1024, 100 * 1024 * 1024, num_records, endpoint=True)
+
+    # Introduce a spike for a specific service/day to simulate anomaly
+    anomaly_mask = rng.random(num_records) < 0.05 # 5% chance of an anomaly
+    num_anomalies = int(anomaly_mask.sum())
+    cost[anomaly_mask] *= rng.uniform(5, 20, num_anomalies) # 5x to 20x spike
+    usage_amount[anomaly_mask] *= rng.integers(5, 20, num_anomalies, endpoint=True)
+    logger.info(f"Simulating {num_anomalies} anomalies ({100 * num_anomalies / max(num_records, 1):.2f}% of records)")
+    if logger.isEnabledFor(logging.DEBUG):
+        for i in np.flatnonzero(anomaly_mask):
+            logger.debug(f"Simulating anomaly: {service_arr[i]} on {dates[i]} with cost {cost[i]:.2f}")
+
+    # ARN prefix per service, built once, e.g. "Amazon Elastic Compute Cloud" -> "arn:aws:elasticcomputecloud:"
+    arn_prefixes = np.asarray([f"arn:aws:{service.lower().replace('amazon ', '').replace(' ', '')}:" for service in services])
+    resource_suffixes = rng.integers(1000, 9999, num_records, endpoint=True).astype('U4')
+    resource_ids = np.char.add(np.char.add(np.char.add(arn_prefixes[service_idx], region_arr),
+                                           ":123456789012:resource-"), resource_suffixes)
+
+    usage_start = dates.astype('datetime64[ms]')
+
+    # The columns go straight into an Arrow table (the format written to Parquet), with no pandas step.
+    return pa.table({
+        # Native timestamps (8-byte INT64 in Parquet) rather than formatted strings
+        "line_item_usage_start_date": usage_start,
+        "line_item_usage_end_date": usage_start + np.timedelta64(1, 'h'),
+        # Low-cardinality strings are dictionary arrays built straight from the drawn indices;
+        # they stay small in memory and are written as dictionary-encoded Parquet columns.
+        "line_item_usage_type": pa.DictionaryArray.from_arrays(usage_type_idx, usage_types),
+        "line_item_unblended_cost": cost,
+        "line_item_usage_amount": usage_amount,
+        "product_servicecode": pa.DictionaryArray.from_arrays(service_idx, [service.replace("Amazon ", "") for service in services]),
+        "product_region": pa.DictionaryArray.from_arrays(region_idx, regions),
+        "line_item_resource_id": resource_ids
+    })
+
+def generate_flow_log_data(num_records, start_time, vpc_id, project_name, rng):
     """
     Generates synthetic VPC Flow Log data.
+    All random values are drawn from the given numpy Generator (rng); returns a PyArrow Table.
     """
-    data = []
-    internal_ips = [f"10.0.{random.randint(0,255)}.{random.randint(0,255)}" for _ in range(10)]
-    external_ips = [f"{random.randint(1,254)}.{random.randint(0,254)}.{random.randint(1,254)}.{random.randint(1,254)}" for _ in range(10)]
-    
-    for _ in range(num_records):
-        timestamp = int(start_time.timestamp()) + random.randint(0, 3599) # Within an hour
-        src_ip = random.choice(internal_ips)
-        dst_ip = random.choice(external_ips)
-        bytes_transferred = random.randint(1000, 1000000) # 1KB to 1MB
-        packets = random.randint(10, 1000)
-        dst_port = random.choice([80, 443, 8080, 22, 53])
-        protocol = random.choice([6, 17]) # TCP, UDP
-        action = "ACCEPT"
-        
-        # Simulate egress spike
-        if random.random() < 0.02: # 2% chance of a large flow
-            bytes_transferred *= random.randint(5, 50)
-            packets *= random.randint(5, 50)
-            logger.info(f"Simulating large flow: {bytes_transferred} bytes from {src_ip} to {dst_ip}:{dst_port}")
-
-        data.append({
-            "version": 2,
-            "account_id": "123456789012", # Dummy account ID
-            "interface_id": f"eni-{random.randint(10000000,99999999)}",
-            "srcaddr": src_ip,
-            "dstaddr": dst_ip,
-            "srcport": random.randint(1024, 65535),
-            "dstport": dst_port,
-            "protocol": protocol,
-            "bytes": bytes_transferred,
-            "packets": packets,
-            "start": timestamp,
-            "end": timestamp + random.randint(10, 600),
-            "action": action,
-            "log_status": "OK",
-            "vpc_id": vpc_id,
-            "subnet_id": f"subnet-{random.randint(10000000,99999999)}",
-            "instance_id": f"i-{random.randint(10000000,99999999)}",
-            "tcp_flags": random.randint(0, 255),
-            "type": "IPv4",
-            "pkt_srcaddr": src_ip,
-            "pkt_dstaddr": dst_ip,
-            "region": "us-east-1" # Dummy region
-        })
-    
-    df = pd.DataFrame(data)
-    return df
+    # Address pools are drawn as 32-bit integers (10.0.x.y internal, public-looking external) and only the
+    # pool entries are formatted; each row just stores an index into its pool.
+    internal_ips = np.uint32(10 << 24) + rng.integers(0, 1 << 16, 10, dtype=np.uint32)
+    external_octets = rng.integers([1, 0, 1, 1], [255, 255, 255, 255], (10, 4)).astype(np.uint32)
+    external_ips = (external_octets[:, 0] << 24) | (external_octets[:, 1] << 16) | (external_octets[:, 2] << 8) | external_octets[:, 3]
+    internal_ip_strings = ipv4_to_strings(internal_ips)
+    external_ip_strings = ipv4_to_strings(external_ips)
+
+    # Columns are drawn in batched calls and assembled once, with no per-record dicts.
+    # Start offsets and durations are each one int32 draw; Unix seconds fit in int32, half the width of int64
+    timestamps = np.int32(start_time.timestamp()) + rng.integers(0, 3599, num_records, endpoint=True, dtype=np.int32) # Within an hour
+    durations = rng.integers(10, 600, num_records, endpoint=True, dtype=np.int32)
+    src_ip_idx = rng.integers(0, len(internal_ips), num_records, dtype=np.int8)
+    dst_ip_idx = rng.integers(0, len(external_ips), num_records, dtype=np.int8)
+    bytes_transferred = rng.integers(1000, 1000000, num_records, endpoint=True) # 1KB to 1MB
+    packets = rng.integers(10, 1000, num_records, endpoint=True, dtype=np.int32)
+    dst_ports = rng.choice(np.array([80, 443, 8080, 22, 53], dtype=np.uint16), num_records)
+    protocols = rng.choice(np.array([6, 17], dtype=np.uint8), num_records) # TCP, UDP
+
+    # Simulate egress spike
+    large_flow_mask = rng.random(num_records) < 0.02 # 2% chance of a large flow
+    num_large_flows = int(large_flow_mask.sum())
+    bytes_transferred[large_flow_mask] *= rng.integers(5, 50, num_large_flows, endpoint=True)
+    packets[large_flow_mask] *= rng.integers(5, 50, num_large_flows, endpoint=True)
+    logger.info(f"Simulating {num_large_flows} large flows ({100 * num_large_flows / max(num_records, 1):.2f}% of records)")
+    if logger.isEnabledFor(logging.DEBUG):
+        for i in np.flatnonzero(large_flow_mask):
+            logger.debug(f"Simulating large flow: {bytes_transferred[i]} bytes from {internal_ip_strings[src_ip_idx[i]]} to {external_ip_strings[dst_ip_idx[i]]}:{dst_ports[i]}")
+
+    def random_ids(prefix):
+        return np.char.add(prefix, rng.integers(10000000, 99999999, num_records, endpoint=True).astype('U8'))
+
+    # Constant strings are single-entry dictionary columns (dictionary-encoded in Parquet)
+    def constant_column(value):
+        return pa.DictionaryArray.from_arrays(np.zeros(num_records, dtype=np.int8), [value])
 
-def upload_dataframe_to_s3(df, bucket_name, key_prefix, file_name):
-    """Uploads a Pandas DataFrame to S3 as a Parquet file."""
-    s3 = boto3.client('s3')
+    # Flow logs carry dotted-quad strings, which the Glue aggregator parses, so addresses are written as
+    # dictionary columns over the formatted pools
+    src_ips = pa.DictionaryArray.from_arrays(src_ip_idx, internal_ip_strings)
+    dst_ips = pa.DictionaryArray.from_arrays(dst_ip_idx, external_ip_strings)
+
+    flow_table = pa.table({
+        # Numeric columns use the narrowest type that holds their range (bytes stays int64, as in real flow logs)
+        "version": np.full(num_records, 2, dtype=np.uint8),
+        "account_id": constant_column("123456789012"), # Dummy account ID
+        "interface_id": random_ids("eni-"),
+        "srcaddr": src_ips,
+        "dstaddr": dst_ips,
+        "srcport": rng.integers(1024, 65535, num_records, endpoint=True, dtype=np.uint16),
+        "dstport": dst_ports,
+        "protocol": protocols,
+        "bytes": bytes_transferred,
+        "packets": packets,
+        "start": timestamps,
+        "end": timestamps + durations,
+        "action": constant_column("ACCEPT"),
+        "log_status": constant_column("OK"),
+        "vpc_id": constant_column(vpc_id),
+        "subnet_id": random_ids("subnet-"),
+        "instance_id": random_ids("i-"),
+        "tcp_flags": rng.integers(0, 255, num_records, endpoint=True, dtype=np.uint8),
+        "type": constant_column("IPv4"),
+        "pkt_srcaddr": src_ips,
+        "pkt_dstaddr": dst_ips,
+        "region": constant_column("us-east-1") # Dummy region
+    })
+
+    # Order rows by destination address, destination port, then source address so neighbouring rows
+    # share values and Parquet's dictionary/RLE encoding compresses them into long runs.
+    row_order = np.lexsort((internal_ips[src_ip_idx], dst_ports, external_ips[dst_ip_idx]))
+    return flow_table.take(row_order)
+
+def upload_table_to_s3(table, bucket_name, key_prefix, file_name):
+    """Uploads a PyArrow Table to S3 as a Parquet file."""
+    s3 = get_s3_client()
     full_key = f"{key_prefix}{file_name}"
     
     try:
-        # Save DataFrame to a buffer as Parquet
+        # Save the table to a buffer as Parquet
         parquet_buffer = io.BytesIO()
-        df.to_parquet(parquet_buffer, index=False)
+        # Millisecond timestamps: Spark/Glue cannot read Parquet's nanosecond TIMESTAMP type.
+        # zstd with larger row groups/pages gives noticeably smaller files than the snappy default.
+        pq.write_table(table, parquet_buffer, coerce_timestamps='ms',
+                       compression='zstd', compression_level=3, use_dictionary=True,
+                       row_group_size=128 * 1024, data_page_size=1024 * 1024)
         parquet_buffer.seek(0) # Rewind to the beginning of the buffer
 
-        s3.put_object(Bucket=bucket_name, Key=full_key, Body=parquet_buffer.getvalue())
-        logger.info(f"Successfully uploaded {len(df)} records to s3://{bucket_name}/{full_key}")
+        # upload_fileobj reads straight from the buffer (no getvalue() copy) and switches to a
+        # concurrent multipart upload once the file passes the multipart threshold.
+        s3.upload_fileobj(parquet_buffer, bucket_name, full_key, Config=TRANSFER_CONFIG)
+        logger.info(f"Successfully uploaded {table.num_rows} records to s3://{bucket_name}/{full_key}")
     except ClientError as e:
         logger.error(f"Failed to upload data to S3: {e}")
         raise
@@ -124,44 +209,127 @@ def upload_dataframe_to_s3(df, bucket_name, key_prefix, file_name):
         logger.error(f"An unexpected error occurred during S3 upload: {e}", exc_info=True)
         raise
 
+def simulate_and_upload(data_type, bucket_name, num_records, start_date, vpc_id, project_name, seed, file_index=0, num_files=1):
+    """
+    Generates one file of synthetic data and uploads it to S3.
+    Runs in a worker process when several files are requested, so it only takes picklable arguments
+    and builds its own numpy Generator from the given seed.
+    """
+    # One generator shared by every random value for this file. SFC64 is a faster bit generator than
+    # the default PCG64 and is statistically sound for simulation.
+    rng = np.random.Generator(np.random.SFC64(seed))
+    # Several files may land on the same day/hour; the index keeps their names apart
+    file_suffix = f"_{file_index:04d}" if num_files > 1 else ""
+
+    if data_type == "cur":
+        logger.info(f"Generating {num_records} synthetic CUR egress data records...")
+        table_simulated = generate_cur_egress_data(num_records, start_date, project_name, rng)
+        # CUR reports are typically delivered with a specific path structure
+        # e.g., <report-prefix>/<report-name>/YYYYMMDD-YYYYMMDD/<hash>/<file>.csv.gz
+        # For simulation, we'll simplify to a daily parquet file.
+        cur_report_date_prefix = (start_date + datetime.timedelta(days=int(rng.integers(0, 30)))).strftime('%Y%m%d') # Pick a random day within range
+        s3_key_prefix = f"egress-cur/{project_name}-report/{cur_report_date_prefix}-{cur_report_date_prefix}/dummyhash/" # Matches typical CUR path structure
+        file_name = f"egress_cost_data_{cur_report_date_prefix}{file_suffix}.parquet"
+        upload_table_to_s3(table_simulated, bucket_name, s3_key_prefix, file_name)
+        logger.info("CUR data simulation complete.")
+
+    elif data_type == "flow_logs":
+        logger.info(f"Generating {num_records} synthetic VPC Flow Log data records for VPC {vpc_id}...")
+        table_simulated = generate_flow_log_data(num_records, datetime.datetime.combine(start_date, datetime.time.min), vpc_id, project_name, rng)
+
+        # Flow logs are typically delivered to S3 in hourly partitions
+        # e.g., vpc_flow_logs/AWSLogs/account_id/vpcflowlogs/region/YYYY/MM/DD/
+        log_date = (start_date + datetime.timedelta(days=int(rng.integers(0, 30)))) # Pick a random day
+        log_hour = int(rng.integers(0, 24)) # Pick a random hour
+        s3_key_prefix = f"vpc_flow_logs/AWSLogs/123456789012/vpcflowlogs/{os.environ.get('AWS_REGION', 'us-east-1')}/{log_date.strftime('%Y/%m/%d')}/"
+        file_name = f"flow_logs_{log_date.strftime('%Y%m%d')}_{log_hour:02d}{file_suffix}.parquet"
+        upload_table_to_s3(table_simulated, bucket_name, s3_key_prefix, file_name)
+        logger.info("VPC Flow Log data simulation complete.")
+
+def load_batch_spec(spec_path, defaults):
+    """
+    Reads a --batch JSON file: a list of objects, each describing one simulation, e.g.
+    [{"data_type": "cur", "num_records": 5000, "start_date": "2024-01-01"},
+     {"data_type": "flow_logs", "num_records": 10000, "vpc_id": "vpc-0123", "num_files": 4}]
+    Fields other than data_type fall back to the command-line values.
+    Returns one (data_type, num_records, start_date, vpc_id, project_name) tuple per file to generate.
+    """
+    with open(spec_path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError("expected a JSON list of simulation objects.")
+
+    simulations = []
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Batch entry {position}: expected a JSON object, got {type(entry).__name__}.")
+        data_type = entry.get("data_type")
+        if data_type not in ("cur", "flow_logs"):
+            raise ValueError(f"Batch entry {position}: data_type must be 'cur' or 'flow_logs', got {data_type!r}.")
+        vpc_id = entry.get("vpc_id", defaults.vpc_id)
+        if data_type == "flow_logs" and not vpc_id:
+            raise ValueError(f"Batch entry {position}: vpc_id is required for 'flow_logs' data_type.")
+        num_records = entry.get("num_records", defaults.num_records)
+        num_files = entry.get("num_files", defaults.num_files)
+        for field, value in (("num_records", num_records), ("num_files", num_files)):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"Batch entry {position}: {field} must be an integer of at least 1, got {value!r}.")
+        start_date = datetime.datetime.strptime(entry.get("start_date", defaults.start_date), '%Y-%m-%d').date()
+        simulation = (data_type, num_records, start_date, vpc_id, entry.get("project_name", defaults.project_name))
+        simulations.extend([simulation] * num_files)
+    return simulations
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simulate AWS egress data and upload to S3.")
     parser.add_argument("--bucket-name", required=True, help="Name of the S3 bucket for raw logs.")
-    parser.add_argument("--data-type", choices=["cur", "flow_logs"], required=True, help="Type of data to simulate: 'cur' or 'flow_logs'.")
+    parser.add_argument("--data-type", choices=["cur", "flow_logs"], help="Type of data to simulate: 'cur' or 'flow_logs' (required unless --batch is given).")
     parser.add_argument("--num-records", type=int, default=1000, help="Number of records to generate.")
     parser.add_argument("--start-date", type=str, default=datetime.date.today().strftime('%Y-%m-%d'), help="Start date for data generation (YYYY-MM-DD).")
     parser.add_argument("--vpc-id", type=str, help="VPC ID for flow logs simulation (required for flow_logs data_type).")
     parser.add_argument("--project-name", type=str, default="egress-cost-optimizer", help="Project name for naming conventions.")
+    parser.add_argument("--num-files", type=int, default=1, help="Number of files to generate, each with --num-records records (generated in parallel).")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output (random if omitted).")
+    parser.add_argument("--batch", type=str, help="Path to a JSON file listing several simulations to run in this one invocation.")
 
     args = parser.parse_args()
 
-    start_date_obj = datetime.datetime.strptime(args.start_date, '%Y-%m-%d').date()
+    if args.batch:
+        # Many simulations in one process (and one worker pool) instead of one script start-up each
+        if args.data_type:
+            parser.error("--data-type cannot be combined with --batch; set data_type in each batch entry.")
+        try:
+            simulations = load_batch_spec(args.batch, args)
+        except (OSError, ValueError) as e:
+            parser.error(f"Invalid --batch file: {e}")
+    else:
+        if not args.data_type:
+            parser.error("--data-type is required unless --batch is given.")
+        if args.data_type == "flow_logs" and not args.vpc_id:
+            parser.error("--vpc-id is required for 'flow_logs' data_type.")
+        if args.num_files < 1:
+            parser.error("--num-files must be at least 1.")
+        start_date_obj = datetime.datetime.strptime(args.start_date, '%Y-%m-%d').date()
+        simulations = [(args.data_type, args.num_records, start_date_obj, args.vpc_id, args.project_name)] * args.num_files
 
-    if args.data_type == "cur":
-        logger.info(f"Generating {args.num_records} synthetic CUR egress data records...")
-        df_simulated = generate_cur_egress_data(args.num_records, start_date_obj, args.project_name)
-        # CUR reports are typically delivered with a specific path structure
-        # e.g., <report-prefix>/<report-name>/YYYYMMDD-YYYYMMDD/<hash>/<file>.csv.gz
-        # For simulation, we'll simplify to a daily parquet file.
-        cur_report_date_prefix = (start_date_obj + datetime.timedelta(days=random.randint(0,29))).strftime('%Y%m%d') # Pick a random day within range
-        s3_key_prefix = f"egress-cur/{args.project_name}-report/{cur_report_date_prefix}-{cur_report_date_prefix}/dummyhash/" # Matches typical CUR path structure
-        file_name = f"egress_cost_data_{cur_report_date_prefix}.parquet"
-        upload_dataframe_to_s3(df_simulated, args.bucket_name, s3_key_prefix, file_name)
-        logger.info("CUR data simulation complete.")
+    num_files = len(simulations)
+    # Independent, non-overlapping random streams, one per file; the same --seed reproduces every file
+    file_seeds = np.random.SeedSequence(args.seed).spawn(num_files)
 
-    elif args.data_type == "flow_logs":
-        if not args.vpc_id:
-            parser.error("--vpc-id is required for 'flow_logs' data_type.")
-        logger.info(f"Generating {args.num_records} synthetic VPC Flow Log data records for VPC {args.vpc_id}...")
-        df_simulated = generate_flow_log_data(args.num_records, datetime.datetime.combine(start_date_obj, datetime.time.min), args.vpc_id, args.project_name)
-        
-        # Flow logs are typically delivered to S3 in hourly partitions
-        # e.g., vpc_flow_logs/AWSLogs/account_id/vpcflowlogs/region/YYYY/MM/DD/
-        log_date = (start_date_obj + datetime.timedelta(days=random.randint(0,29))) # Pick a random day
-        log_hour = random.randint(0,23) # Pick a random hour
-        s3_key_prefix = f"vpc_flow_logs/AWSLogs/123456789012/vpcflowlogs/{os.environ.get('AWS_REGION', 'us-east-1')}/{log_date.strftime('%Y/%m/%d')}/"
-        file_name = f"flow_logs_{log_date.strftime('%Y%m%d')}_{log_hour:02d}.parquet"
-        upload_dataframe_to_s3(df_simulated, args.bucket_name, s3_key_prefix, file_name)
-        logger.info("VPC Flow Log data simulation complete.")
+    if num_files == 1:
+        data_type, num_records, start_date, vpc_id, project_name = simulations[0]
+        simulate_and_upload(data_type, args.bucket_name, num_records, start_date, vpc_id, project_name, file_seeds[0])
+    elif num_files > 1:
+        # Generation and Parquet encoding are CPU-bound, so files are produced in separate processes;
+        # each worker creates its own S3 client, and uploads overlap with generation in other workers.
+        with ProcessPoolExecutor(max_workers=min(num_files, os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(simulate_and_upload, data_type, args.bucket_name, num_records, start_date,
+                                vpc_id, project_name, file_seed, file_index, num_files)
+                for file_index, ((data_type, num_records, start_date, vpc_id, project_name), file_seed)
+                in enumerate(zip(simulations, file_seeds))
+            ]
+            for future in futures:
+                future.result() # Re-raises any worker failure
+        logger.info(f"Generated and uploaded {num_files} files.")
 
-    logger.info("Script finished.")
\ No newline at end of file
+    logger.info("Script finished.")